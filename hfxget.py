@@ -5,41 +5,107 @@ Xget Hugging Face 下载加速器
 """
 
 import argparse
+import fnmatch
+import hashlib
+import json
+import logging
+import logging.handlers
+import mmap
+import os
+import queue
+import random
 import re
+import shutil
 import signal
 import sys
 import threading
 import time
-import traceback
+import weakref
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import urlencode, urlsplit, urlunsplit
 
 import requests
 import urllib3
-from huggingface_hub import HfApi
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.util.ssl_ import create_urllib3_context
+from urllib3.util.retry import Retry
+from huggingface_hub import HfApi, RepoFile
+from huggingface_hub.constants import ENDPOINT as HF_HUB_ENDPOINT
 from huggingface_hub._local_folder import \
     read_download_metadata as hf_read_download_metadata
 from huggingface_hub._local_folder import \
     write_download_metadata as hf_write_download_metadata
 from huggingface_hub.file_download import hf_hub_url
 from huggingface_hub.utils import build_hf_headers
-from huggingface_hub.utils.sha import git_hash, sha_fileobj
 from tqdm import tqdm
 
+try:
+    import httpx
+except ImportError:  # 可选依赖，仅 httpx 下载核心需要
+    httpx = None
+
 # 全局变量用于跟踪中断状态
-interrupted = False
+interrupt_event = threading.Event()
+
+# 正在读取正文的响应，收到中断信号时直接断开连接，使阻塞中的读取立即返回
+_active_responses = weakref.WeakSet()
+_active_responses_lock = threading.Lock()
+
+# 读取循环每隔多少块检查一次中断标志，中断主要依靠断开连接即时生效
+_INTERRUPT_POLL_CHUNKS = 16
 
 # 应用元信息
 APP_NAME = "hfxget"
 APP_VERSION = "1.0"
 
+logger = logging.getLogger(APP_NAME)
+
 # 统一管理 aria2 tqdm 的显示位置，避免多线程冲突
 _aria2_position_lock = threading.Lock()
 _aria2_active_positions = set()
 
 _CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+_GLOB_CHARS_RE = re.compile(r"[*?\[]")
+
+# 每次从响应读取的块大小：1MB 一块，大文件的循环次数、写入与进度更新都减少到 64KB 时的 1/16
+_READ_CHUNK_SIZE = 1024 * 1024
+
+# 不超过该大小的新下载一次读完正文、一次写入，跳过进度条与分块循环
+_SMALL_FILE_SIZE = 1024 * 1024
+
+# 分段写入时每批 pwritev 最多攒的块数和字节数，字节上限控制每个连接占用的内存
+_WRITE_BATCH_BUFFERS = 8
+_WRITE_BATCH_SIZE = 4 * 1024 * 1024
+
+# 分段下载参数：首段从 256KB 起步，之后按测得带宽调整，使每段耗时约为目标秒数
+_MIN_SEGMENT_SIZE = 256 * 1024
+_MAX_SEGMENT_SIZE = 64 * 1024 * 1024
+_SEGMENT_TARGET_SECONDS = 4
+_SEGMENT_MAX_ATTEMPTS = 3
+
+# 单连接下载预分配文件后，每写入这么多数据落盘一次并记录已写入的偏移
+_OFFSET_SAVE_INTERVAL = 64 * 1024 * 1024
+
+# 预校验本地文件的线程数，stat 与元数据读取以 I/O 为主，可以远多于下载线程
+_VERIFY_WORKERS = 32
+
+# 开始下载前每个主机上用 HEAD 预热的文件数量 (LFS 与普通文件分别计数)，
+# 其余文件在下载时再探测，避免大仓库在下载开始前逐个 HEAD
+_WARMUP_FILES_PER_HOST = 4
+
+# 只为大文件显示单独的进度条，小文件只计入总进度
+_FILE_PBAR_MIN_SIZE = 100 * 1024 * 1024
+
+# 总进度条速度统计的刷新间隔 (秒)
+_PROGRESS_REFRESH_SECONDS = 0.1
 
 
 def _aria2_acquire_position():
@@ -56,6 +122,353 @@ def _aria2_release_position(position):
         _aria2_active_positions.discard(position)
 
 
+def _compile_filename_patterns(patterns):
+    """将多个文件名模式编译为单个正则: 含通配符的按 glob 匹配完整路径，其余按子串匹配"""
+    alternatives = []
+    for pattern in patterns:
+        if _GLOB_CHARS_RE.search(pattern):
+            alternatives.append(r"\A" + fnmatch.translate(pattern))
+        else:
+            alternatives.append(re.escape(pattern))
+    return re.compile("|".join(alternatives))
+
+
+def _file_size(path):
+    """只做一次 stat 取得文件大小，文件不存在时返回 None"""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def _preallocate(fd, size):
+    """预分配文件空间，不支持 posix_fallocate 的平台退化为 truncate"""
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)
+
+
+def _sync_data(fd):
+    """把已写入的数据刷到磁盘后再记录进度，断电后记录不会指向仍是空洞的区间"""
+    getattr(os, "fdatasync", os.fsync)(fd)
+
+
+def _fadvise(fd, advice):
+    """向内核提示文件访问模式，不支持 posix_fadvise 的平台直接忽略"""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+
+# 没有 os.pwrite 的平台 (Windows) 用锁保护 lseek + write
+_seek_write_lock = threading.Lock()
+
+
+def _write_at(fd, buffers, offset):
+    """在指定偏移依次写入一组缓冲区，多个线程可以并发写入同一文件的不同区域"""
+    views = [memoryview(buffer) for buffer in buffers]
+    if hasattr(os, "pwritev"):
+        while views:
+            written = os.pwritev(fd, views, offset)
+            offset += written
+            # 丢掉已写完的缓冲区，部分写入的缓冲区从剩余位置继续
+            while views and written >= len(views[0]):
+                written -= len(views.pop(0))
+            if written:
+                views[0] = views[0][written:]
+        return
+    if hasattr(os, "pwrite"):
+        for view in views:
+            while view:
+                written = os.pwrite(fd, view, offset)
+                view = view[written:]
+                offset += written
+        return
+    with _seek_write_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        for view in views:
+            while view:
+                view = view[os.write(fd, view):]
+
+
+class _BatchedWriter:
+    """把连续收到的数据块攒成一批，用一次 pwritev 写入文件的对应偏移
+
+    退出上下文时写出剩余数据，连接中断前收到的数据同样会落盘
+    """
+
+    def __init__(self, fd, offset):
+        self.fd = fd
+        self.offset = offset
+        self.buffers = []
+        self.size = 0
+
+    def write(self, data):
+        self.buffers.append(data)
+        self.size += len(data)
+        if len(self.buffers) >= _WRITE_BATCH_BUFFERS or self.size >= _WRITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffers:
+            _write_at(self.fd, self.buffers, self.offset)
+            self.offset += self.size
+            self.buffers = []
+            self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+def _sha256_file(path):
+    """通过 mmap 流式计算文件 SHA-256，避免逐块 read 的额外拷贝"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            h.update(mm)
+        # 哈希只读一遍，读完释放页缓存，避免大文件挤掉其他缓存
+        _fadvise(f.fileno(), "POSIX_FADV_DONTNEED")
+    return h.hexdigest()
+
+
+def _git_blob_sha1(path):
+    """流式计算 git blob 哈希 sha1("blob <大小>\\0" + 内容)，不把整个文件读入内存"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        h.update(f"blob {os.fstat(f.fileno()).st_size}\0".encode())
+        while chunk := f.read(_READ_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _compute_etag(path, is_lfs):
+    """按 Hub 的规则计算文件 ETag：LFS 文件为 SHA-256，普通文件为 git blob sha1
+
+    hashlib 对大块数据计算时会释放 GIL，校验线程池中的多个文件可以同时占用多个核心
+    """
+    return _sha256_file(path) if is_lfs else _git_blob_sha1(path)
+
+
+class _BandwidthEstimator:
+    """按服务器维护最近若干个分段下载速度的调和平均值"""
+
+    def __init__(self, window=16):
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples = {}
+
+    def record(self, host, nbytes, seconds):
+        if nbytes <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            samples = self._samples.setdefault(host, deque(maxlen=self._window))
+            samples.append(nbytes / seconds)
+
+    def estimate(self, host):
+        with self._lock:
+            samples = self._samples.get(host)
+            if not samples:
+                return None
+            # 调和平均对偶发的高速样本不敏感，估计更保守
+            return len(samples) / sum(1 / bw for bw in samples)
+
+
+_bandwidth_estimator = _BandwidthEstimator()
+
+
+def _parts_path(temp_path):
+    """分段下载进度记录文件的路径"""
+    return temp_path.with_name(temp_path.name + ".parts.json")
+
+
+def _offset_path(temp_path):
+    """单连接下载已写入偏移记录文件的路径"""
+    return temp_path.with_name(temp_path.name + ".offset.json")
+
+
+def _load_offset(path):
+    """读取记录的已写入偏移，记录不存在或损坏时返回 None"""
+    try:
+        return int(json.loads(path.read_text(encoding="utf-8"))["offset"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_offset(path, offset):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps({"offset": offset}), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _prepare_temp_file(local_path, resume):
+    """确定临时文件路径，并整理上次留下的临时文件，返回 (temp_path, 续传起点)
+
+    分段下载留下的临时文件按完整大小预分配、中间可能有空洞，连同进度记录一起删除；
+    存在偏移记录时说明预分配的单连接文件未及截断，按记录的偏移截断后再续传
+    """
+    if not resume:
+        if local_path.exists():
+            logger.info(f"♻️  覆盖现有文件: {local_path.name}")
+        return local_path, 0
+
+    temp_path = local_path.with_suffix(local_path.suffix + ".incomplete")
+    parts_path = _parts_path(temp_path)
+    if parts_path.exists():
+        temp_path.unlink(missing_ok=True)
+        parts_path.unlink(missing_ok=True)
+
+    offset_path = _offset_path(temp_path)
+    saved_offset = _load_offset(offset_path)
+    offset_path.unlink(missing_ok=True)
+
+    initial_pos = _file_size(temp_path) or 0
+    if saved_offset is not None and saved_offset < initial_pos:
+        os.truncate(temp_path, saved_offset)
+        initial_pos = saved_offset
+    if initial_pos > 0:
+        logger.info(
+            f"断点续传: {local_path.name} (从 {initial_pos / (1024*1024):.1f} MB 开始)"
+        )
+    else:
+        temp_path.unlink(missing_ok=True)
+    return temp_path, initial_pos
+
+
+class _PartsRecord:
+    """分段下载的进度记录 (.parts.json)
+
+    保存已完成的字节区间 (闭区间，按起点排序且已合并)，中断后只补下缺失的区间；
+    记录存在即表示临时文件是按完整大小预分配、中间可能有空洞的分段文件
+    """
+
+    def __init__(self, path, total_size, etag, done=None):
+        self.path = path
+        self.total_size = total_size
+        self.etag = etag
+        self.done = done or []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, total_size, etag):
+        """读取已有记录，大小或 ETag 与本次下载不一致时返回 None"""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if data.get("size") != total_size or data.get("etag") != etag:
+            return None
+        return cls(path, total_size, etag, [list(r) for r in data.get("done", [])])
+
+    def missing(self):
+        """返回尚未完成的区间"""
+        gaps = []
+        pos = 0
+        for start, end in self.done:
+            if start > pos:
+                gaps.append([pos, start - 1])
+            pos = max(pos, end + 1)
+        if pos < self.total_size:
+            gaps.append([pos, self.total_size - 1])
+        return gaps
+
+    def completed_bytes(self):
+        return sum(end - start + 1 for start, end in self.done)
+
+    def add(self, start, end):
+        """登记一个已完成的区间并写回磁盘"""
+        with self._lock:
+            merged = []
+            for r in sorted([*self.done, [start, end]]):
+                if merged and r[0] <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], r[1])
+                else:
+                    merged.append(list(r))
+            self.done = merged
+            self.save()
+
+    def save(self):
+        data = {"size": self.total_size, "etag": self.etag, "done": self.done}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+
+
+class _SegmentRangeUnsupported(Exception):
+    """服务器未按请求返回 206 分段响应"""
+
+
+class _DownloadInterrupted(Exception):
+    """下载被用户中断或被其他分段的失败终止"""
+
+
+def _advertised_etag(response, expected_etag):
+    """从响应及其重定向历史中取出与期望 ETag 同格式的服务端 ETag
+
+    LFS 文件的 sha256 通常在 X-Linked-Etag 中，CDN 自身的 ETag 格式不同会被忽略
+    """
+    for hop in (*response.history, response):
+        for header in ("x-linked-etag", "etag"):
+            value = hop.headers.get(header)
+            if not value:
+                continue
+            value = value.strip().removeprefix("W/").strip('"')
+            if len(value) == len(expected_etag):
+                return value
+    return None
+
+
+def _retry_after_seconds(response, default=5, cap=300):
+    """解析 Retry-After 头 (秒数或 HTTP 日期)，缺失时返回默认等待时间"""
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return min(cap, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            delay = parsedate_to_datetime(value) - datetime.now(timezone.utc)
+            return min(cap, max(0.0, delay.total_seconds()))
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+class _RetryCooldown:
+    """所有下载线程共享的冷却期，服务端限流 (429/503) 时统一暂停发起新请求"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def defer(self, seconds):
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+    def wait(self):
+        while not interrupt_event.is_set():
+            with self._lock:
+                remaining = self._until - time.monotonic()
+            if remaining <= 0:
+                return
+            interrupt_event.wait(remaining)
+
+
+_retry_cooldown = _RetryCooldown()
+
+
 def build_default_hf_headers(token=None):
     return build_hf_headers(
         token=token,
@@ -64,12 +477,155 @@ def build_default_hf_headers(token=None):
     )
 
 
+class _TqdmLoggingHandler(logging.Handler):
+    """通过 tqdm.write 输出日志，避免打断进度条"""
+
+    def emit(self, record):
+        try:
+            tqdm.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def setup_logging(level=logging.INFO):
+    """配置异步日志：工作线程只把记录放入队列，由监听线程统一输出"""
+    log_queue = queue.Queue(-1)
+    handler = _TqdmLoggingHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
+class _ByteCounter:
+    """按线程分别累加的字节计数器，读取循环里无需加锁，读取总数时再汇总"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def add(self, nbytes):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._local.cell = [0]
+            with self._lock:
+                self._cells.append(cell)
+        cell[0] += nbytes
+
+    def total(self):
+        with self._lock:
+            return sum(cell[0] for cell in self._cells)
+
+
+_bytes_counter = _ByteCounter()
+
+
+@contextmanager
+def _refresh_in_background(callback, interval):
+    """后台线程按固定间隔调用 callback，退出时停止线程并再调用一次"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            callback()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+        callback()
+
+
+def _file_progress_bar(name, total_size, initial=0):
+    """单个文件的字节进度条，小于 _FILE_PBAR_MIN_SIZE 的文件不显示
+
+    数据按 1MB 一块更新，mininterval 限制重绘频率，smoothing 让速率估计更平稳
+    """
+    return tqdm(
+        desc=name,
+        total=total_size,
+        initial=initial,
+        unit="B",
+        unit_scale=True,
+        unit_divisor=1024,
+        leave=False,
+        disable=not total_size or total_size < _FILE_PBAR_MIN_SIZE,
+        mininterval=0.25,
+        smoothing=0.1,
+        bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]",
+    )
+
+
+class _ProgressReader:
+    """包装 urllib3 响应供 shutil.copyfileobj 读取，顺带更新进度条和字节计数
+
+    收到中断信号后返回空数据结束复制，由调用方检查中断标志；
+    每读取 _OFFSET_SAVE_INTERVAL 字节调用一次 checkpoint，此时之前读到的数据都已交给写入方；
+    传入 hasher 时读到的数据同时送入哈希
+    """
+
+    def __init__(self, raw, pbar, checkpoint=None, hasher=None):
+        self.raw = raw
+        self.pbar = pbar
+        self.checkpoint = checkpoint
+        self.hasher = hasher
+        self.reads = 0
+        self.unsaved = 0
+
+    def read(self, size=-1):
+        if self.reads % _INTERRUPT_POLL_CHUNKS == 0 and interrupt_event.is_set():
+            return b""
+        if self.checkpoint is not None and self.unsaved >= _OFFSET_SAVE_INTERVAL:
+            self.checkpoint()
+            self.unsaved = 0
+        self.reads += 1
+        data = self.raw.read(size, decode_content=True)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        self.unsaved += len(data)
+        self.pbar.update(len(data))
+        _bytes_counter.add(len(data))
+        return data
+
+
+@contextmanager
+def _abortable(response):
+    """登记读取中的响应，收到中断信号时由信号处理器断开其连接"""
+    with _active_responses_lock:
+        _active_responses.add(response)
+    try:
+        yield response
+    finally:
+        with _active_responses_lock:
+            _active_responses.discard(response)
+
+
 def signal_handler(signum, frame):
     """处理Ctrl+C中断信号"""
-    global interrupted
-    interrupted = True
+    interrupt_event.set()
     print("\n\n⚠️  检测到中断信号 (Ctrl+C)，正在停止下载...")
-    print("请等待当前下载任务完成...")
+    print("正在断开进行中的下载连接...")
+
+    # 只有下载线程会登记响应，主线程不会持有该锁，这里不会死锁
+    with _active_responses_lock:
+        responses = list(_active_responses)
+    for response in responses:
+        try:
+            # urllib3 2.3+ 的 shutdown 可以唤醒其他线程中阻塞的读取
+            if hasattr(response.raw, "shutdown"):
+                response.raw.shutdown()
+            else:
+                response.close()
+        except Exception:
+            pass
 
 
 # 注册信号处理器
@@ -81,6 +637,45 @@ class DownloadResult:
     success: bool
     status_code: int | None = None
     message: str | None = None
+    retry_after: float | None = None
+    # 从头下载且调用方要求时，传输过程中顺带算出的完整内容 SHA-256，免去下载后重读文件
+    sha256: str | None = None
+    # 下载器确认文件的每个字节都由本次传输写入 (而非预分配或沿用的旧数据)，
+    # 此时调用方可以直接信任服务端给出的哈希
+    complete: bool = False
+
+
+@dataclass(slots=True)
+class RepoFileInfo:
+    """仓库中单个文件的元信息，is_lfs 与期望 ETag 在构造时算好供后续直接读取"""
+
+    filename: str
+    size: int | None = None
+    lfs: dict | None = None
+    blob_id: str | None = None
+    is_lfs: bool = field(init=False)
+    etag: str | None = field(init=False)
+
+    def __post_init__(self):
+        self.is_lfs = self.lfs is not None
+        # LFS 文件的 ETag 是内容 sha256，普通文件是 git blob id
+        self.etag = self.lfs.get("sha256") if self.is_lfs else self.blob_id
+
+
+def _throttled_result(response, name, message):
+    """服务端限流 (429/503) 时返回带等待时间的失败结果，其他情况返回 None"""
+    if response is None or response.status_code not in [429, 503]:
+        return None
+    retry_after = _retry_after_seconds(response)
+    logger.warning(
+        f"⏳ HTTP {response.status_code}: {name} | 服务端要求等待 {retry_after:.0f}s"
+    )
+    return DownloadResult(
+        success=False,
+        status_code=response.status_code,
+        message=message,
+        retry_after=retry_after,
+    )
 
 
 class DownloaderInterface(ABC):
@@ -88,9 +683,20 @@ class DownloaderInterface(ABC):
 
     @abstractmethod
     def download_file(
-        self, url: str, local_path: str, resume: bool = True
+        self,
+        url: str,
+        local_path: str,
+        resume: bool = True,
+        expected_size: int | None = None,
+        expected_etag: str | None = None,
+        compute_sha256: bool = False,
     ) -> DownloadResult:
-        """下载单个文件"""
+        """下载单个文件，compute_sha256 为 True 时尽量在传输中计算内容哈希"""
+        pass
+
+    @abstractmethod
+    def probe(self, url: str) -> int | None:
+        """发送 HEAD 请求预热连接，返回状态码，请求失败时返回 None"""
         pass
 
     @abstractmethod
@@ -99,54 +705,95 @@ class DownloaderInterface(ABC):
         pass
 
 
+# 所有 requests 会话共用的 TLS 上下文，CA 证书只在这里加载一次
+_SSL_CONTEXT = create_urllib3_context()
+_SSL_CONTEXT.load_verify_locations(DEFAULT_CA_BUNDLE_PATH)
+
+
+class _SharedTLSAdapter(HTTPAdapter):
+    """使用共享 TLS 上下文的适配器
+
+    默认情况下每个连接池各建一个 SSLContext，且每次新建连接都重新读取 CA 证书文件；
+    这里让校验证书的 HTTPS 连接池共用 _SSL_CONTEXT，并去掉逐连接的证书加载
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(
+            request, verify, cert
+        )
+        if verify is True and host_params["scheme"] == "https":
+            pool_kwargs["ssl_context"] = _SSL_CONTEXT
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if getattr(conn, "conn_kw", {}).get("ssl_context") is _SSL_CONTEXT:
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
 class RequestsDownloader(DownloaderInterface):
     """基于 requests 库的下载器"""
-    def __init__(self, headers):
-        self.default_headers = headers
+    def __init__(self, headers, max_workers=4, connections_per_worker=2):
+        # 所有文件共用一个会话，复用 keep-alive 连接；连接池按并发数确定大小
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        # http 与 https 挂载同一个适配器，共用一个连接池管理器 (自建的 http 镜像也能复用连接)
+        adapter = _SharedTLSAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers * connections_per_worker,
+            max_retries=Retry(total=0),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def get_name(self):
         return "requests"
 
-    def download_file(self, url, local_path, resume=True):
+    def probe(self, url):
+        response = self._head(url)
+        return None if response is None else response.status_code
+
+    def _head(self, url):
+        """发送 HEAD 请求，请求失败时返回 None"""
+        try:
+            response = self.session.head(url, timeout=10, allow_redirects=True)
+        except requests.RequestException:
+            return None
+        response.close()
+        return response
+
+    def download_file(
+        self,
+        url,
+        local_path,
+        resume=True,
+        expected_size=None,
+        expected_etag=None,
+        compute_sha256=False,
+    ):
         """使用 requests 下载文件"""
         local_path = Path(local_path)
-        local_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if not resume:
-            temp_path = local_path
-            if local_path.exists():
-                print(f"♻️  覆盖现有文件: {local_path.name}")
-        else:
-            temp_path = local_path.with_suffix(local_path.suffix + ".incomplete")
+        temp_path, initial_pos = _prepare_temp_file(local_path, resume)
+        # 偏移记录只在预分配后、截断前存在，进程被强制结束时供下次续传截断使用
+        offset_path = _offset_path(temp_path)
 
-        session = requests.Session()
-        session.headers.update(self.default_headers)
-
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-        headers = session.headers.copy()
+        # 会话级请求头由 requests 自动合并，这里只传入需要覆盖的 Range
+        request_headers = None
         mode = "wb"
-        initial_pos = 0
         attempting_resume = False
 
-        if resume and temp_path.exists() and temp_path != local_path:
-            initial_pos = temp_path.stat().st_size
-            if initial_pos > 0:
-                headers["Range"] = f"bytes={initial_pos}-"
-                mode = "ab"
-                attempting_resume = True
-                print(
-                    f"断点续传: {local_path.name} (从 {initial_pos / (1024*1024):.1f} MB 开始)"
-                )
-            else:
-                temp_path.unlink(missing_ok=True)
+        if initial_pos > 0:
+            request_headers = {"Range": f"bytes={initial_pos}-"}
+            mode = "ab"
+            attempting_resume = True
 
         try:
             response = None
             while True:
-                response = session.get(
+                response = self.session.get(
                     url,
-                    headers=headers,
+                    headers=request_headers,
                     stream=True,
                     timeout=(30, 60),
                     verify=True,
@@ -158,91 +805,627 @@ class RequestsDownloader(DownloaderInterface):
 
                 if response.status_code == 416:
                     if temp_path.exists() and temp_path != local_path:
-                        local_path.unlink(missing_ok=True)
-                        temp_path.rename(local_path)
-                        print(f"✅ 本地已完整，重命名: {local_path.name}")
+                        temp_path.replace(local_path)
+                        logger.info(f"✅ 本地已完整，重命名: {local_path.name}")
                         return DownloadResult(success=True)
                     return DownloadResult(success=True)
 
                 if response.status_code != 206:
                     response.close()
-                    headers = session.headers.copy()
+                    request_headers = None
                     mode = "wb"
                     initial_pos = 0
                     attempting_resume = False
                     temp_path.unlink(missing_ok=True)
-                    print(f"⚠️  服务器不支持 Range，重新下载: {local_path.name}")
+                    logger.warning(f"⚠️  服务器不支持 Range，重新下载: {local_path.name}")
                     continue
 
                 content_range = response.headers.get("content-range")
                 if not content_range:
                     response.close()
-                    headers = session.headers.copy()
+                    request_headers = None
                     mode = "wb"
                     initial_pos = 0
                     attempting_resume = False
                     temp_path.unlink(missing_ok=True)
-                    print(f"⚠️  Range 响应缺少 Content-Range，重新下载: {local_path.name}")
+                    logger.warning(f"⚠️  Range 响应缺少 Content-Range，重新下载: {local_path.name}")
                     continue
 
                 match = _CONTENT_RANGE_RE.match(content_range)
                 if not match or int(match.group(1)) != initial_pos:
                     response.close()
-                    headers = session.headers.copy()
+                    request_headers = None
                     mode = "wb"
                     initial_pos = 0
                     attempting_resume = False
                     temp_path.unlink(missing_ok=True)
-                    print(f"⚠️  Range 偏移不匹配，重新下载: {local_path.name}")
+                    logger.warning(f"⚠️  Range 偏移不匹配，重新下载: {local_path.name}")
                     continue
 
                 break
 
             response.raise_for_status()
+
+            # 镜像内容与期望版本不一致时在传输正文前放弃，避免下载后才校验失败
+            if expected_etag:
+                remote_etag = _advertised_etag(response, expected_etag)
+                if remote_etag and remote_etag != expected_etag:
+                    response.close()
+                    if temp_path != local_path:
+                        temp_path.unlink(missing_ok=True)
+                    logger.warning(
+                        f"⚠️  远端 ETag 不匹配: {local_path.name} | 期望 {expected_etag}, 远端 {remote_etag}"
+                    )
+                    return DownloadResult(
+                        success=False, status_code=412, message="etag mismatch"
+                    )
+
             try:
                 total_size = int(response.headers.get("content-length", 0)) + initial_pos
             except (TypeError, ValueError):
                 total_size = None
 
-            with open(temp_path, mode) as f:
-                with tqdm(
-                    desc=local_path.name,
-                    total=total_size,
-                    initial=initial_pos,
-                    unit="B",
-                    unit_scale=True,
-                    unit_divisor=1024,
-                    leave=False,
-                    bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]",
-                ) as pbar:
-                    for chunk in response.iter_content(chunk_size=65536):
-                        if interrupted:
-                            print(f"\n⏹️  下载被中断: {local_path.name}")
-                            return DownloadResult(success=False, message="interrupted")
-                        if chunk:
-                            f.write(chunk)
-                            pbar.update(len(chunk))
+            # 配置、分词器等小文件占仓库文件数的大头，按 open/write/close/rename 最少的路径写入
+            if mode == "wb" and total_size and total_size <= _SMALL_FILE_SIZE:
+                body = response.raw.read(decode_content=True)
+                with open(temp_path, "wb") as f:
+                    f.write(body)
+                _bytes_counter.add(len(body))
+                if temp_path != local_path:
+                    temp_path.replace(local_path)
+                return DownloadResult(
+                    success=True,
+                    sha256=hashlib.sha256(body).hexdigest() if compute_sha256 else None,
+                    complete=True,
+                )
+
+            # 续传时前面的数据不经过本次传输，只有从头下载才能边下载边计算哈希
+            hasher = hashlib.sha256() if compute_sha256 and initial_pos == 0 else None
+
+            with _abortable(response), open(
+                temp_path, mode, buffering=_READ_CHUNK_SIZE
+            ) as f:
+                _fadvise(f.fileno(), "POSIX_FADV_SEQUENTIAL")
+                # 全新下载时一次性预分配空间，减少文件增长带来的碎片和元数据更新
+                preallocated = mode == "wb" and bool(total_size)
+                checkpoint = None
+                if preallocated:
+                    if temp_path != local_path:
+                        _save_offset(offset_path, 0)
+
+                        def checkpoint():
+                            f.flush()
+                            _sync_data(f.fileno())
+                            _save_offset(offset_path, f.tell())
+
+                    _preallocate(f.fileno(), total_size)
+                try:
+                    with _file_progress_bar(local_path.name, total_size, initial_pos) as pbar:
+                        # 直接从 urllib3 响应按 1MB 读取并写入，循环由 copyfileobj 完成
+                        shutil.copyfileobj(
+                            _ProgressReader(response.raw, pbar, checkpoint, hasher),
+                            f,
+                            _READ_CHUNK_SIZE,
+                        )
+                finally:
+                    # 未下载完整时截断到实际写入位置，续传依赖文件大小作为偏移
+                    if preallocated:
+                        f.truncate(f.tell())
+                        offset_path.unlink(missing_ok=True)
+                    # 写完的数据不会再读，提示内核尽快回收页缓存，降低大文件下载时的内存压力
+                    f.flush()
+                    _fadvise(f.fileno(), "POSIX_FADV_DONTNEED")
+
+            # 连接被信号处理器断开时读取可能提前结束，不能当作下载完成
+            if interrupt_event.is_set():
+                logger.warning(f"\n⏹️  下载被中断: {local_path.name}")
+                return DownloadResult(success=False, message="interrupted")
 
             if temp_path != local_path:
-                local_path.unlink(missing_ok=True)
-                temp_path.rename(local_path)
+                temp_path.replace(local_path)
 
-            return DownloadResult(success=True)
+            return DownloadResult(
+                success=True,
+                sha256=hasher.hexdigest() if hasher else None,
+                complete=True,
+            )
 
         except Exception as e:
+            if interrupt_event.is_set():
+                logger.warning(f"\n⏹️  下载被中断: {local_path.name}")
+                return DownloadResult(success=False, message="interrupted")
             if (
                 hasattr(e, "response")
                 and e.response is not None
                 and e.response.status_code in [401, 403, 404]
             ):
-                print(f"🚫 HTTP {e.response.status_code}: {local_path.name}")
+                logger.warning(f"🚫 HTTP {e.response.status_code}: {local_path.name}")
                 temp_path.unlink(missing_ok=True)
                 return DownloadResult(
                     success=False, status_code=e.response.status_code, message=str(e)
                 )
+            throttled = _throttled_result(
+                getattr(e, "response", None), local_path.name, str(e)
+            )
+            if throttled is not None:
+                return throttled
             else:
-                print(f"❌ 下载失败: {local_path.name}")
-            print(f"原因: {str(e)}")
+                logger.error(f"❌ 下载失败: {local_path.name}")
+            logger.error(f"原因: {str(e)}")
+            return DownloadResult(success=False, message=str(e))
+
+
+class ParallelRangeDownloader(RequestsDownloader):
+    """将大文件拆分为多个 Range 分段并发下载的 requests 下载器
+
+    不超过阈值的文件、或服务器不支持分段时，退回 RequestsDownloader 的单连接下载；
+    已完成的区间记录在 .parts.json 中，中断后只补下缺失的部分
+    """
+
+    def __init__(
+        self,
+        headers,
+        max_workers=4,
+        split_threshold=50 * 1024 * 1024,
+        max_connections_per_file=8,
+    ):
+        super().__init__(
+            headers,
+            max_workers=max_workers,
+            connections_per_worker=max_connections_per_file,
+        )
+        self.split_threshold = split_threshold
+        self.max_connections_per_file = max_connections_per_file
+        # 预热阶段的 HEAD 响应，下载时取出复用，每个响应只用一次，重试时重新探测
+        self._probe_responses = {}
+
+    def get_name(self):
+        return "parallel"
+
+    def probe(self, url):
+        response = self._head(url)
+        if response is None:
+            return None
+        # 只保留会走分段下载的响应，失败的文件会改走 HF，小文件不做 HEAD 复用
+        content_length = response.headers.get("Content-Length", "")
+        if (
+            response.status_code == 200
+            and content_length.isdigit()
+            and int(content_length) > self.split_threshold
+        ):
+            self._probe_responses[url] = response
+        return response.status_code
+
+    def download_file(
+        self,
+        url,
+        local_path,
+        resume=True,
+        expected_size=None,
+        expected_etag=None,
+        compute_sha256=False,
+    ):
+        """大文件分段并发下载，其余情况交给单连接下载"""
+        local_path = Path(local_path)
+        temp_path = local_path.with_suffix(local_path.suffix + ".incomplete")
+        probe = self._probe_responses.pop(url, None)
+
+        # 已有单连接的续传文件 (没有分段记录) 时继续走单连接续传
+        if (
+            resume
+            and expected_size
+            and expected_size > self.split_threshold
+            and (not temp_path.exists() or _parts_path(temp_path).exists())
+        ):
+            result = self._download_ranged(
+                url, local_path, temp_path, expected_size, expected_etag, probe
+            )
+            if result is not None:
+                return result
+
+        return super().download_file(
+            url, local_path, resume, expected_size, expected_etag, compute_sha256
+        )
+
+    def _segment_size(self, host):
+        """根据该服务器的带宽估计决定下一个分段的大小"""
+        bandwidth = _bandwidth_estimator.estimate(host)
+        if bandwidth is None:
+            return _MIN_SEGMENT_SIZE
+        size = int(bandwidth * _SEGMENT_TARGET_SECONDS)
+        return max(_MIN_SEGMENT_SIZE, min(size, _MAX_SEGMENT_SIZE))
+
+    def _download_ranged(
+        self, url, local_path, temp_path, total_size, expected_etag=None, probe=None
+    ):
+        """将大文件拆分为 Range 分段并发下载，各分段直接写入预分配文件的对应偏移
+
+        服务器不支持分段下载时返回 None，由调用方回退到单连接下载
+        """
+        host = urlsplit(url).netloc
+        cursor_lock = threading.Lock()
+        pbar_lock = threading.Lock()
+        abort = threading.Event()
+        gaps = []
+
+        def claim_segment():
+            # 从最靠前的缺失区间切出下一段
+            with cursor_lock:
+                if abort.is_set() or interrupt_event.is_set() or not gaps:
+                    return None
+                start, gap_end = gaps[0]
+                end = min(start + self._segment_size(host) - 1, gap_end)
+                if end == gap_end:
+                    gaps.pop(0)
+                else:
+                    gaps[0][0] = end + 1
+                return start, end
+
+        def on_progress(nbytes):
+            _bytes_counter.add(nbytes)
+            if not pbar.disable:
+                with pbar_lock:
+                    pbar.update(nbytes)
+
+        def worker(fd):
+            try:
+                while (segment := claim_segment()) is not None:
+                    start, end = segment
+                    self._download_segment(
+                        url, fd, start, end, host, on_progress, abort, record
+                    )
+            except BaseException:
+                abort.set()
+                raise
+
+        # 先用 HEAD 确认服务器支持 Range、大小与预期一致，再发起分段请求；
+        # 预热阶段已经探测过的直接使用其响应
+        if probe is None:
+            try:
+                probe = self.session.head(url, timeout=(30, 60), allow_redirects=True)
+            except requests.RequestException as e:
+                # 临时的网络错误不代表服务器不支持分段，交给外层重试并保留已有的分段进度
+                logger.warning(f"⚠️  HEAD 探测失败: {local_path.name} | {e}")
+                return DownloadResult(success=False, message=f"HEAD failed: {e}")
+        if probe.status_code in [401, 403, 404]:
+            logger.warning(f"🚫 HTTP {probe.status_code}: {local_path.name}")
+            return DownloadResult(
+                success=False,
+                status_code=probe.status_code,
+                message=f"HEAD {probe.status_code}",
+            )
+        throttled = _throttled_result(
+            probe, local_path.name, f"HEAD {probe.status_code}"
+        )
+        if throttled is not None:
+            return throttled
+        if probe.status_code >= 500:
+            logger.warning(f"⚠️  HEAD 探测失败 (HTTP {probe.status_code}): {local_path.name}")
+            return DownloadResult(
+                success=False,
+                status_code=probe.status_code,
+                message=f"HEAD {probe.status_code}",
+            )
+        if expected_etag:
+            remote_etag = _advertised_etag(probe, expected_etag)
+            if remote_etag and remote_etag != expected_etag:
+                logger.warning(
+                    f"⚠️  远端 ETag 不匹配: {local_path.name} | 期望 {expected_etag}, 远端 {remote_etag}"
+                )
+                return DownloadResult(
+                    success=False, status_code=412, message="etag mismatch"
+                )
+        if (
+            probe.status_code != 200
+            or probe.headers.get("accept-ranges", "").lower() != "bytes"
+            or probe.headers.get("content-length") != str(total_size)
+        ):
+            logger.warning(f"⚠️  服务器不支持分段下载，改用单连接: {local_path.name}")
+            return None
+
+        parts_path = _parts_path(temp_path)
+        record = None
+        if _file_size(temp_path) == total_size:
+            record = _PartsRecord.load(parts_path, total_size, expected_etag)
+        resuming = record is not None
+        if not resuming:
+            record = _PartsRecord(parts_path, total_size, expected_etag)
+        gaps = record.missing()
+        completed = record.completed_bytes()
+        num_connections = max(
+            1,
+            min(
+                (total_size - completed) // _MIN_SEGMENT_SIZE,
+                self.max_connections_per_file,
+            ),
+        )
+
+        if resuming:
+            logger.info(
+                f"🧩 分段续传: {local_path.name} | 已完成 {completed / (1024*1024):.1f}/{total_size / (1024*1024):.1f} MB | {num_connections} 个连接"
+            )
+        else:
+            logger.info(
+                f"🧩 分段下载: {local_path.name} | {total_size / (1024*1024):.1f} MB | {num_connections} 个连接"
+            )
+        try:
+            # 所有分段共用一个文件描述符，按偏移 pwrite，无需合并也无需逐线程打开文件
+            flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+            fd = os.open(temp_path, flags if resuming else flags | os.O_TRUNC)
+            try:
+                if not resuming:
+                    # 先写出空记录，标明临时文件是分段文件，避免被当作单连接文件续传；
+                    # 单连接下载留下的偏移记录对分段文件无效
+                    record.save()
+                    _offset_path(temp_path).unlink(missing_ok=True)
+                    _preallocate(fd, total_size)
+
+                with _file_progress_bar(local_path.name, total_size, completed) as pbar:
+                    with ThreadPoolExecutor(max_workers=num_connections) as executor:
+                        futures = [
+                            executor.submit(worker, fd) for _ in range(num_connections)
+                        ]
+                    # 其他分段因 abort 退出时抛出 _DownloadInterrupted，优先报告真正的失败原因
+                    errors = [f.exception() for f in futures if f.exception() is not None]
+                    errors.sort(key=lambda e: isinstance(e, _DownloadInterrupted))
+                    if errors:
+                        raise errors[0]
+                    # 中断时各分段线程领不到新分段会正常退出，必须确认所有区间都已写入才能完成
+                    if interrupt_event.is_set() or record.missing():
+                        raise _DownloadInterrupted()
+            finally:
+                _fadvise(fd, "POSIX_FADV_DONTNEED")
+                os.close(fd)
+
+            record.discard()
+            temp_path.replace(local_path)
+            return DownloadResult(success=True, complete=True)
+
+        except _SegmentRangeUnsupported:
+            temp_path.unlink(missing_ok=True)
+            record.discard()
+            logger.warning(f"⚠️  服务器不支持分段下载，改用单连接: {local_path.name}")
+            return None
+        except _DownloadInterrupted:
+            # 保留临时文件和进度记录，下次只补下缺失的区间
+            logger.warning(f"\n⏹️  下载被中断: {local_path.name}")
+            return DownloadResult(success=False, message="interrupted")
+        except Exception as e:
+            if (
+                hasattr(e, "response")
+                and e.response is not None
+                and e.response.status_code in [401, 403, 404]
+            ):
+                temp_path.unlink(missing_ok=True)
+                record.discard()
+                logger.warning(f"🚫 HTTP {e.response.status_code}: {local_path.name}")
+                return DownloadResult(
+                    success=False, status_code=e.response.status_code, message=str(e)
+                )
+            throttled = _throttled_result(
+                getattr(e, "response", None), local_path.name, str(e)
+            )
+            if throttled is not None:
+                return throttled
+            logger.error(f"❌ 分段下载失败: {local_path.name}")
+            logger.error(f"原因: {str(e)}")
+            return DownloadResult(success=False, message=str(e))
+
+    def _download_segment(self, url, fd, start, end, host, on_progress, abort, record):
+        """下载 [start, end] 分段，连接中断时从已写入的位置继续
+
+        分段失败或被中断时把已写入的部分登记到进度记录，续传时只补剩下的字节
+        """
+        segment_start = start
+        failures = 0
+        try:
+            while start <= end:
+                began = time.monotonic()
+                written = 0
+                try:
+                    writer = _BatchedWriter(fd, start)
+                    with writer, self.session.get(
+                        url,
+                        headers={"Range": f"bytes={start}-{end}"},
+                        stream=True,
+                        timeout=(30, 60),
+                        verify=True,
+                        allow_redirects=True,
+                    ) as response, _abortable(response):
+                        response.raise_for_status()
+                        match = _CONTENT_RANGE_RE.match(
+                            response.headers.get("content-range", "")
+                        )
+                        if (
+                            response.status_code != 206
+                            or not match
+                            or int(match.group(1)) != start
+                        ):
+                            raise _SegmentRangeUnsupported(url)
+
+                        chunks = 0
+                        while chunk := response.raw.read(
+                            _READ_CHUNK_SIZE, decode_content=True
+                        ):
+                            # 其他分段失败时需要尽快停止，abort 每块都检查
+                            if abort.is_set() or (
+                                chunks % _INTERRUPT_POLL_CHUNKS == 0
+                                and interrupt_event.is_set()
+                            ):
+                                raise _DownloadInterrupted()
+                            chunks += 1
+                            chunk = chunk[: end - start + 1]
+                            writer.write(chunk)
+                            start += len(chunk)
+                            written += len(chunk)
+                            on_progress(len(chunk))
+                            if start > end:
+                                break
+                    if written == 0:
+                        raise requests.ConnectionError("分段响应为空")
+                except (
+                    requests.ConnectionError,
+                    requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError,
+                    urllib3.exceptions.HTTPError,
+                ) as e:
+                    # 连接被信号处理器断开，不再重试
+                    if interrupt_event.is_set():
+                        raise _DownloadInterrupted() from e
+                    failures += 1
+                    if failures >= _SEGMENT_MAX_ATTEMPTS:
+                        raise
+                    logger.warning(f"⚠️  分段连接中断，继续下载 ({failures}/{_SEGMENT_MAX_ATTEMPTS}): {e}")
+                finally:
+                    # 以实际落盘的位置为准，缓冲区写出失败时不会多记
+                    start = writer.offset
+                    _bandwidth_estimator.record(host, written, time.monotonic() - began)
+        except BaseException:
+            if start > segment_start:
+                _sync_data(fd)
+                record.add(segment_start, start - 1)
+            raise
+        _sync_data(fd)
+        record.add(segment_start, end)
+
+
+class HttpxDownloader(DownloaderInterface):
+    """基于 httpx 的下载器，使用 HTTP/2 在少量连接上多路复用大量小文件请求"""
+
+    def __init__(self, headers, max_workers=4):
+        if httpx is None:
+            raise ImportError("httpx 下载核心需要先安装: pip install 'httpx[http2]'")
+        self.client = httpx.Client(
+            http2=True,
+            headers=headers,
+            follow_redirects=True,
+            timeout=httpx.Timeout(60, connect=30),
+            limits=httpx.Limits(
+                max_connections=max_workers * 2,
+                max_keepalive_connections=max_workers,
+            ),
+        )
+
+    def get_name(self):
+        return "httpx"
+
+    def probe(self, url):
+        try:
+            response = self.client.head(url, timeout=10)
+        except httpx.HTTPError:
+            return None
+        return response.status_code
+
+    def download_file(
+        self,
+        url,
+        local_path,
+        resume=True,
+        expected_size=None,
+        expected_etag=None,
+        compute_sha256=False,
+    ):
+        """使用 httpx 下载文件"""
+        local_path = Path(local_path)
+        temp_path, initial_pos = _prepare_temp_file(local_path, resume)
+
+        request_headers = None
+        mode = "wb"
+        hasher = None
+
+        if initial_pos > 0:
+            request_headers = {"Range": f"bytes={initial_pos}-"}
+            mode = "ab"
+
+        try:
+            while True:
+                with self.client.stream("GET", url, headers=request_headers) as response:
+                    if initial_pos:
+                        if response.status_code == 416:
+                            temp_path.replace(local_path)
+                            logger.info(f"✅ 本地已完整，重命名: {local_path.name}")
+                            return DownloadResult(success=True)
+
+                        match = _CONTENT_RANGE_RE.match(
+                            response.headers.get("content-range", "")
+                        )
+                        if (
+                            response.status_code != 206
+                            or not match
+                            or int(match.group(1)) != initial_pos
+                        ):
+                            request_headers = None
+                            mode = "wb"
+                            initial_pos = 0
+                            temp_path.unlink(missing_ok=True)
+                            logger.warning(f"⚠️  Range 续传无效，重新下载: {local_path.name}")
+                            continue
+
+                    response.raise_for_status()
+
+                    if expected_etag:
+                        remote_etag = _advertised_etag(response, expected_etag)
+                        if remote_etag and remote_etag != expected_etag:
+                            if temp_path != local_path:
+                                temp_path.unlink(missing_ok=True)
+                            logger.warning(
+                                f"⚠️  远端 ETag 不匹配: {local_path.name} | 期望 {expected_etag}, 远端 {remote_etag}"
+                            )
+                            return DownloadResult(
+                                success=False, status_code=412, message="etag mismatch"
+                            )
+
+                    try:
+                        total_size = (
+                            int(response.headers.get("content-length", 0)) + initial_pos
+                        )
+                    except (TypeError, ValueError):
+                        total_size = None
+
+                    if compute_sha256 and initial_pos == 0:
+                        hasher = hashlib.sha256()
+                    with open(temp_path, mode) as f:
+                        with _file_progress_bar(local_path.name, total_size, initial_pos) as pbar:
+                            # httpx 的响应无法从信号处理器断开，每块都检查中断
+                            for chunk in response.iter_bytes(chunk_size=_READ_CHUNK_SIZE):
+                                if interrupt_event.is_set():
+                                    logger.warning(f"\n⏹️  下载被中断: {local_path.name}")
+                                    return DownloadResult(
+                                        success=False, message="interrupted"
+                                    )
+                                f.write(chunk)
+                                if hasher is not None:
+                                    hasher.update(chunk)
+                                pbar.update(len(chunk))
+                                _bytes_counter.add(len(chunk))
+                break
+
+            if temp_path != local_path:
+                temp_path.replace(local_path)
+
+            return DownloadResult(
+                success=True,
+                sha256=hasher.hexdigest() if hasher else None,
+                complete=True,
+            )
+
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            if status_code in [401, 403, 404]:
+                logger.warning(f"🚫 HTTP {status_code}: {local_path.name}")
+                temp_path.unlink(missing_ok=True)
+                return DownloadResult(
+                    success=False, status_code=status_code, message=str(e)
+                )
+            throttled = _throttled_result(e.response, local_path.name, str(e))
+            if throttled is not None:
+                return throttled
+            logger.error(f"❌ 下载失败: {local_path.name}")
+            logger.error(f"原因: {str(e)}")
+            return DownloadResult(success=False, message=str(e))
+        except Exception as e:
+            logger.error(f"❌ 下载失败: {local_path.name}")
+            logger.error(f"原因: {str(e)}")
             return DownloadResult(success=False, message=str(e))
 
 
@@ -252,58 +1435,81 @@ class HFDownloader:
         lfs_base_url="https://xget.xi-xu.me/hf",
         hf_base_url="https://xget.xi-xu.me/hf",
         hf_downloader_type="requests",
-        lfs_downloader_type="requests",
+        lfs_downloader_type="parallel",
         token=None,
+        max_workers=4,
+        verify_mode="etag",
     ):
         self.lfs_base_url = lfs_base_url
         self.hf_base_url = hf_base_url
         self.hf_api = HfApi(endpoint=hf_base_url, token=token)
         self.header = build_default_hf_headers(token=token)
 
+        # 校验方式: etag 信任本地元数据，sha256 对 LFS 文件重新计算哈希
+        if verify_mode not in ("etag", "sha256"):
+            raise ValueError(f"不支持的校验方式: {verify_mode}")
+        self.verify_mode = verify_mode
+
         # LFS 文件大小阈值 (50MB)
         self.lfs_size_threshold = 50 * 1024 * 1024
 
         # 选择下载器
         self.hf_downloader: DownloaderInterface | None = None
         if hf_downloader_type == "requests":
-            self.hf_downloader = RequestsDownloader(self.header)
+            self.hf_downloader = RequestsDownloader(self.header, max_workers=max_workers)
+        elif hf_downloader_type == "httpx":
+            self.hf_downloader = HttpxDownloader(self.header, max_workers=max_workers)
         else:
             raise ValueError(f"不支持的下载器类型: {hf_downloader_type}")
 
         self.lfs_downloader: DownloaderInterface | None = None
-        if lfs_downloader_type == "requests":
-            self.lfs_downloader = RequestsDownloader(self.header)
+        if lfs_downloader_type == "parallel":
+            self.lfs_downloader = ParallelRangeDownloader(
+                self.header,
+                max_workers=max_workers,
+                split_threshold=self.lfs_size_threshold,
+            )
+        elif lfs_downloader_type == "requests":
+            self.lfs_downloader = RequestsDownloader(self.header, max_workers=max_workers)
+        elif lfs_downloader_type == "httpx":
+            self.lfs_downloader = HttpxDownloader(self.header, max_workers=max_workers)
         else:
             raise ValueError(f"不支持的下载器类型: {lfs_downloader_type}")
 
-        print(f"🪞  HF 地址: {self.hf_base_url}")
-        print(f"🛠️  HF 下载核心: {self.hf_downloader.get_name()}")
-        print(f"🚀  LFS 地址: {self.lfs_base_url}")
-        print(f"🛠️  LFS 下载核心: {self.lfs_downloader.get_name()}")
+        logger.info(f"🪞  HF 地址: {self.hf_base_url}")
+        logger.info(f"🛠️  HF 下载核心: {self.hf_downloader.get_name()}")
+        logger.info(f"🚀  LFS 地址: {self.lfs_base_url}")
+        logger.info(f"🛠️  LFS 下载核心: {self.lfs_downloader.get_name()}")
 
     def get_repo_file_list(self, repo_id, repo_type="model", revision="main"):
         """获取仓库文件列表和详细信息"""
         try:
-            print(f"📡 获取文件列表: {repo_type} {repo_id} @ {revision}")
+            logger.info(f"📡 获取文件列表: {repo_type} {repo_id} @ {revision}")
 
+            # repo_info 只用于解析提交哈希，expand 限定只返回 sha，不附带完整的 siblings 列表
             repo_info = self.hf_api.repo_info(
-                repo_id, repo_type=repo_type, revision=revision, files_metadata=True
+                repo_id, repo_type=repo_type, revision=revision, expand=["sha"]
             )
-            
-            self.commit_hash = repo_info.sha
-            print(f"🔖 提交哈希: {self.commit_hash}")
-
-            files_info = []
-            for sibling in repo_info.siblings:
-                file_info = {
-                    "filename": sibling.rfilename,
-                    "size": sibling.size,
-                    "lfs": sibling.lfs,
-                    "blob_id": sibling.blob_id,
-                }
-                files_info.append(file_info)
 
-            return files_info
+            self.commit_hash = repo_info.sha
+            logger.info(f"🔖 提交哈希: {self.commit_hash}")
+
+            # 文件树按页流式获取并固定到该提交，大仓库无需一次性解析完整的 siblings 元数据
+            return [
+                RepoFileInfo(
+                    filename=entry.path,
+                    size=entry.size,
+                    lfs=entry.lfs,
+                    blob_id=entry.blob_id,
+                )
+                for entry in self.hf_api.list_repo_tree(
+                    repo_id,
+                    recursive=True,
+                    revision=self.commit_hash,
+                    repo_type=repo_type,
+                )
+                if isinstance(entry, RepoFile)
+            ]
 
         except Exception as e:
             # 检查是否是401错误，如果是则不重试
@@ -312,137 +1518,121 @@ class HFDownloader:
                 and e.response is not None
                 and e.response.status_code == 401
             ):
-                print(f"🚫 访问受限 (401): {repo_id} | {e}")
+                logger.warning(f"🚫 访问受限 (401): {repo_id} | {e}")
                 return []
-            print(f"❌ 获取文件列表失败: {e}")
+            logger.error(f"❌ 获取文件列表失败: {e}")
             return []
 
-    def is_lfs_file(self, file_info):
-        """判断文件是否为 LFS 文件"""
-        return file_info.get("lfs") is not None
-
     def build_download_url(
         self, repo_id, filename, repo_type="model", revision="main", is_lfs=False
     ):
-        """构建下载 URL"""
-        # 确保文件名在URL中使用正斜杠
-        url_filename = filename.replace("\\", "/")
-
+        """构建下载 URL，同时返回镜像不可用时使用的 HF 回退地址"""
+        # LFS 文件使用 LFS 地址，普通文件使用 HF 地址
         if is_lfs:
-            # LFS 文件使用 LFS 地址
-            if repo_type == "dataset":
-                hf_url = f"https://huggingface.co/datasets/{repo_id}/resolve/{revision}/{url_filename}?download=true"
-            elif repo_type == "space":
-                hf_url = f"https://huggingface.co/spaces/{repo_id}/resolve/{revision}/{url_filename}?download=true"
-            else:  # model
-                hf_url = f"https://huggingface.co/{repo_id}/resolve/{revision}/{url_filename}?download=true"
-
-            download_url = hf_url.replace("https://huggingface.co", self.lfs_base_url)
+            base_url = self.lfs_base_url
             url_type = "LFS"
         else:
-            # 普通文件
-            # download_url = hf_hub_url(
-            #     repo_id,
-            #     filename,
-            #     repo_type=repo_type,
-            #     revision=revision,
-            #     endpoint=self.hf_base_url,
-            # )
-            # url_type = "HF"
-            if repo_type == "dataset":
-                hf_url = f"https://huggingface.co/datasets/{repo_id}/resolve/{revision}/{url_filename}?download=true"
-            elif repo_type == "space":
-                hf_url = f"https://huggingface.co/spaces/{repo_id}/resolve/{revision}/{url_filename}?download=true"
-            else:  # model
-                hf_url = f"https://huggingface.co/{repo_id}/resolve/{revision}/{url_filename}?download=true"
-
-            download_url = hf_url.replace("https://huggingface.co", self.hf_base_url)
+            base_url = self.hf_base_url
             url_type = "HF-URL"
 
-        hf_mirror_param = {
-            "repo_id": repo_id,
-            "filename": filename,
-            "revision": revision,
-            "repo_type": repo_type,
-        }
-
-        return download_url, url_type, hf_mirror_param
-
-    def _extract_expected_etag(self, file_info):
-        """从文件信息中解析期望的 ETag。"""
-
-        lfs_info = file_info.get("lfs")
-        if lfs_info is not None:
-            sha256 = lfs_info.get("sha256")
-            return sha256
+        def resolve_url(endpoint):
+            # 由 hf_hub_url 处理仓库类型前缀，并对分支名、文件名中的特殊字符转义
+            url = hf_hub_url(
+                repo_id,
+                filename,
+                repo_type=repo_type,
+                revision=revision,
+                endpoint=endpoint,
+            )
+            return urlunsplit(
+                urlsplit(url)._replace(query=urlencode({"download": "true"}))
+            )
 
-        return file_info.get("blob_id")
+        # 回退地址指向 Hugging Face 官方端点 (可由 HF_ENDPOINT 环境变量覆盖)，绕开镜像
+        return resolve_url(base_url), url_type, resolve_url(HF_HUB_ENDPOINT)
 
     def verify_file_integrity(
-        self, local_dir, file_path: Path, file_info, force_regenerate_etag=False
+        self,
+        local_dir: Path,
+        file_path: Path,
+        file_info,
+        force_regenerate_etag=False,
+        content_sha256=None,
     ):
-        """通过元数据验证文件完整性。"""
+        """通过元数据验证文件完整性。
+
+        content_sha256 为下载时已算出的内容哈希，sha256 模式下直接使用，不再重读文件
+        """
 
-        if not file_path.exists():
+        actual_size = _file_size(file_path)
+        if actual_size is None:
+            return False
+
+        expected_size = file_info.size
+        if expected_size is not None and actual_size != expected_size:
+            logger.error(
+                f"❌ 文件大小不匹配: {file_path.name} | 期望 {expected_size}, 实际 {actual_size}"
+            )
             return False
 
-        expected_size = file_info.get("size")
-        if expected_size is not None:
-            actual_size = file_path.stat().st_size
-            if actual_size != expected_size:
-                print(
-                    f"❌ 文件大小不匹配: {file_path.name} | 期望 {expected_size}, 实际 {actual_size}"
+        # 显式要求时，直接对 LFS 文件内容计算 SHA-256 并与仓库记录比对
+        if self.verify_mode == "sha256" and file_info.is_lfs:
+            expected_etag = file_info.etag
+            actual_etag = content_sha256 or _sha256_file(file_path)
+            if expected_etag and actual_etag != expected_etag:
+                logger.error(
+                    f"❌ SHA-256 不匹配: {file_path.name} | 期望 {expected_etag}, 实际 {actual_etag}"
                 )
                 return False
+            self._write_local_metadata(local_dir, file_info, etag=actual_etag)
+            return True
 
         metadata = None
-        filename = file_info.get("filename")
-
-        if force_regenerate_etag:
-            self._write_local_metadata(local_dir, file_info)
+        filename = file_info.filename
+        expected_etag = file_info.etag
 
         try:
-            metadata = hf_read_download_metadata(Path(local_dir), filename)
+            metadata = hf_read_download_metadata(local_dir, filename)
         except Exception as e:
-            print(f"⚠️  读取元数据失败 {file_path.name}: {e}")
+            logger.warning(f"⚠️  读取元数据失败 {file_path.name}: {e}")
 
-        if metadata is None:
+        # 元数据已与期望一致时直接通过，不重新计算哈希也不改写元数据；
+        # 文件在元数据写入后被修改过时 hf_read_download_metadata 会返回 None
+        if metadata is not None and (not expected_etag or metadata.etag == expected_etag):
+            return True
+
+        if metadata is None or force_regenerate_etag:
             self._write_local_metadata(local_dir, file_info)
             try:
-                metadata = hf_read_download_metadata(Path(local_dir), filename)
+                metadata = hf_read_download_metadata(local_dir, filename)
             except Exception as e:
-                print(f"⚠️  读取元数据失败 {file_path.name}: {e}")
+                logger.warning(f"⚠️  读取元数据失败 {file_path.name}: {e}")
 
         if metadata is None:
-            print(f"⚠️  未找到有效元数据 {file_path.name}")
+            logger.warning(f"⚠️  未找到有效元数据 {file_path.name}")
             return False
 
-        expected_etag = self._extract_expected_etag(file_info)
         if expected_etag and metadata.etag != expected_etag:
-            print(
+            logger.error(
                 f"❌ ETag 不匹配: {file_path.name} | 期望 {expected_etag}, 实际 {metadata.etag}"
             )
             return False
 
         return True
 
-    def _write_local_metadata(self, local_dir, file_info):
+    def _write_local_metadata(self, local_dir: Path, file_info, etag=None):
         """将下载的文件元数据写入本地缓存目录。"""
 
-        filename = file_info.get("filename")
-        if self.is_lfs_file(file_info):
-            with open(Path(local_dir) / filename, "rb") as f:
-                etag = sha_fileobj(f).hex()
-        else:
-            with open(Path(local_dir) / filename, "rb") as f:
-                etag = git_hash(f.read())
+        filename = file_info.filename
+        if etag is None:
+            etag = _compute_etag(local_dir / filename, file_info.is_lfs)
 
         try:
             hf_write_download_metadata(
-                Path(local_dir), filename, self.commit_hash, etag
+                local_dir, filename, self.commit_hash, etag
             )
         except Exception as e:
-            print(f"⚠️  写入元数据失败 {file_info['filename']}: {e}")
+            logger.warning(f"⚠️  写入元数据失败 {file_info.filename}: {e}")
 
     def download_and_verify_file(
         self,
@@ -451,27 +1641,32 @@ class HFDownloader:
         local_path: Path,
         file_info,
         url_type,
-        hf_mirror_param,
+        fallback_url,
         max_attempts=5,
+        skip_initial_verify=False,
     ):
-        """下载文件并验证完整性"""
+        """下载文件并验证完整性
+
+        skip_initial_verify 为 True 表示调用方已确认本地文件无效，首次不再重复校验
+        """
 
         attempt = 0
 
-        download_success = False
         performed_download = False
+        content_sha256 = None
         while True:
-            if interrupted:
-                print(f"⏹️  下载被中断，跳过: {local_path.name}")
+            if interrupt_event.is_set():
+                logger.warning(f"⏹️  下载被中断，跳过: {local_path.name}")
                 return {"success": False, "downloaded": False, "url_type": url_type}
 
-            if self.verify_file_integrity(
+            if not (skip_initial_verify and attempt == 0) and self.verify_file_integrity(
                 local_dir,
                 local_path,
                 file_info,
                 force_regenerate_etag=performed_download,
+                content_sha256=content_sha256,
             ):
-                print(f"✅ 已存在且通过校验: {local_path.name}")
+                logger.info(f"✅ 已存在且通过校验: {local_path.name}")
                 return {
                     "success": True,
                     "downloaded": performed_download,
@@ -482,108 +1677,93 @@ class HFDownloader:
 
             if attempt >= max_attempts:
                 # 下载失败
-                print(f"🚫 达到最大重试次数，放弃下载: {local_path.name}")
+                logger.warning(f"🚫 达到最大重试次数，放弃下载: {local_path.name}")
                 return {"success": False, "downloaded": False, "url_type": url_type}
 
+            # 其他任务触发限流时，等冷却期结束再发起请求
+            _retry_cooldown.wait()
+
             attempt += 1
             attempt_note = f"{attempt}/{max_attempts}次尝试"
-            print(f"📥 开始下载: {local_path.name} | 来源: {url_type} | {attempt_note} | URL: {url}")
+            # 镜像不可用时改用 HF 地址，仍由同一个下载器和连接池完成，沿用其续传逻辑
+            download_url = fallback_url if url_type == "HF" else url
+            logger.info(f"📥 开始下载: {local_path.name} | 来源: {url_type} | {attempt_note} | URL: {download_url}")
             final_source = url_type
+            download_success = False
+            content_sha256 = None
 
-            if url_type in ["LFS"]:
+            if url_type in ["LFS", "HF-URL", "HF"]:
+                downloader = (
+                    self.lfs_downloader if url_type == "LFS" else self.hf_downloader
+                )
                 try:
-                    download_result = self.lfs_downloader.download_file(url, local_path)
+                    download_result = downloader.download_file(
+                        download_url,
+                        local_path,
+                        expected_size=file_info.size,
+                        expected_etag=file_info.etag,
+                        compute_sha256=self.verify_mode == "sha256" and file_info.is_lfs,
+                    )
                     performed_download = True
+                    content_sha256 = download_result.sha256
 
                     if download_result.success:
                         download_success = True
                     else:
                         status_code = download_result.status_code
-                        if status_code in {401, 403, 404}:
-                            print(
-                                f"🔀 LFS 下载错误：{status_code=}, 尝试切换 HF 下载: {local_path.name}"
+                        # 已在使用回退地址，或回退地址与当前地址相同时，切换来源没有意义；
+                        # 412 是内容与期望版本不一致，重试同一来源也不会改变，同样直接放弃
+                        can_fall_back = url_type != "HF" and fallback_url != url
+                        if not can_fall_back and status_code in {401, 403, 404, 412}:
+                            logger.warning(
+                                f"🚫 {url_type} 下载失败，不再重试 ({status_code}): {local_path.name} | {download_result.message}"
                             )
-                            local_path.unlink(missing_ok=True)
-                            control_file = Path(str(local_path) + ".aria2")
-                            control_file.unlink(missing_ok=True)
-                            url_type = "HF"
-                        else:
-                            message = download_result.message
-                            if message:
-                                print(
-                                    f"⚠️ LFS 下载未完成: {local_path.name} | {message}"
-                                )
-                            else:
-                                print(f"⚠️ LFS 下载未完成: {local_path.name}")
-                except Exception as e:
-                    performed_download = True
-                    print(f"❌ LFS 下载异常: {local_path.name} | {e}")
-                    print(traceback.format_exc())
-            elif url_type in ["HF-URL"]:
-                try:
-                    download_result = self.hf_downloader.download_file(url, local_path)
-                    performed_download = True
-
-                    if download_result.success:
-                        download_success = True
-                    else:
-                        status_code = download_result.status_code
-                        if status_code in {401, 403, 404}:
-                            print(
-                                f"🔀 HF-URL 下载错误：{status_code=}, 尝试切换 HF 下载: {local_path.name}"
+                            return {
+                                "success": False,
+                                "downloaded": performed_download,
+                                "url_type": url_type,
+                            }
+                        # 412 表示镜像内容与当前版本不一致，同样切换到 HF 下载
+                        if can_fall_back and status_code in {401, 403, 404, 412}:
+                            logger.warning(
+                                f"🔀 {url_type} 下载错误：{status_code=}, 尝试切换 HF 下载: {local_path.name}"
                             )
                             local_path.unlink(missing_ok=True)
                             control_file = Path(str(local_path) + ".aria2")
                             control_file.unlink(missing_ok=True)
                             url_type = "HF"
                         else:
+                            if download_result.retry_after:
+                                _retry_cooldown.defer(download_result.retry_after)
                             message = download_result.message
                             if message:
-                                print(
-                                    f"⚠️ HF-URL 下载未完成: {local_path.name} | {message}"
+                                logger.warning(
+                                    f"⚠️ {url_type} 下载未完成: {local_path.name} | {message}"
                                 )
                             else:
-                                print(f"⚠️ HF-URL 下载未完成: {local_path.name}")
-                except Exception as e:
-                    performed_download = True
-                    print(f"❌ LFS 下载异常: {local_path.name} | {e}")
-                    print(traceback.format_exc())
-            elif url_type in ["HF"]:
-                try:
-                    self.hf_api.hf_hub_download(
-                        **hf_mirror_param, local_dir=local_dir, resume_download=True
-                    )
-                    download_success = True
-                    performed_download = True
+                                logger.warning(f"⚠️ {url_type} 下载未完成: {local_path.name}")
                 except Exception as e:
                     performed_download = True
-                    if (
-                        hasattr(e, "response")
-                        and e.response is not None
-                        and e.response.status_code in [401, 403, 404]
-                    ):
-                        print(
-                            f"🚫 HF 访问受限 ({e.response.status_code}): {local_path.name} | {e}"
-                        )
-                        return {
-                            "success": False,
-                            "downloaded": performed_download,
-                            "url_type": url_type,
-                        }
-                    print(f"❌ HF下载异常: {local_path.name} | {e}")
+                    logger.error(f"❌ {url_type} 下载异常: {local_path.name} | {e}")
+                    # 重试期间的异常很常见，完整堆栈只在调试级别输出
+                    logger.debug("下载异常堆栈", exc_info=True)
             else:
-                print(f"❌ 未知下载类型: {url_type} | {local_path.name}")
+                logger.error(f"❌ 未知下载类型: {url_type} | {local_path.name}")
                 return {"success": False, "downloaded": False, "url_type": url_type}
 
             if not download_success:
                 if attempt < max_attempts:
-                    wait_seconds = 2
-                    print(
-                        f"🔁 准备重试: {local_path.name} | 下一次尝试 {attempt + 1}/{max_attempts} | 等待 {wait_seconds}s"
+                    if url_type != final_source:
+                        # 已切换下载来源，无需等待
+                        continue
+                    # 带抖动的指数退避，避免并发任务同步重试
+                    wait_seconds = min(30, 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                    logger.info(
+                        f"🔁 准备重试: {local_path.name} | 下一次尝试 {attempt + 1}/{max_attempts} | 等待 {wait_seconds:.1f}s"
                     )
-                    time.sleep(wait_seconds)
+                    interrupt_event.wait(wait_seconds)
                     continue
-                print(f"🚫 放弃下载: {local_path.name} | 已达最大重试次数")
+                logger.warning(f"🚫 放弃下载: {local_path.name} | 已达最大重试次数")
                 return {
                     "success": False,
                     "downloaded": performed_download,
@@ -591,11 +1771,62 @@ class HFDownloader:
                 }
 
             if download_success:
-                if local_path.exists():
-                    size_mb = local_path.stat().st_size / (1024 * 1024)
-                    print(f"✅ 下载结束: {local_path.name} | {size_mb:.3f} MB")
+                size = _file_size(local_path)
+                if size is not None:
+                    size_mb = size / (1024 * 1024)
+                    logger.info(f"✅ 下载结束: {local_path.name} | {size_mb:.3f} MB")
                 else:
-                    print(f"✅ 下载结束: {local_path.name}")
+                    logger.info(f"✅ 下载结束: {local_path.name}")
+                # 下载器确认整个文件都由本次传输写入、且已核对过远端 ETag 时，直接写入服务端给出的
+                # sha256，不为写元数据重读整个文件；其余情况 (含启动时已存在的文件) 仍按内容计算
+                if (
+                    download_result.complete
+                    and file_info.is_lfs
+                    and file_info.etag
+                    and self.verify_mode != "sha256"
+                ):
+                    self._write_local_metadata(local_dir, file_info, etag=file_info.etag)
+
+    def _warm_up(self, files_to_download, max_workers):
+        """并发发送 HEAD 请求，提前完成 DNS 解析和 TLS 握手，并找出镜像上不可用的文件
+
+        每个主机上的 LFS 文件和普通文件各只取前几个，其余文件在下载阶段按需探测；
+        返回 401/403/404 的文件直接改为 HF 下载，省去下载阶段的失败与重试
+        """
+        counts = {}
+        indices = []
+        for i, task in enumerate(files_to_download):
+            url, url_type = task[0], task[3]
+            if url_type == "HF":
+                continue
+            key = (urlsplit(url).netloc, url_type)
+            if counts.get(key, 0) < _WARMUP_FILES_PER_HOST:
+                counts[key] = counts.get(key, 0) + 1
+                indices.append(i)
+        if not indices:
+            return files_to_download
+
+        def probe(i):
+            url, _, _, url_type, _ = files_to_download[i]
+            downloader = self.lfs_downloader if url_type == "LFS" else self.hf_downloader
+            return downloader.probe(url)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            statuses = list(executor.map(probe, indices))
+
+        files_to_download = list(files_to_download)
+        unavailable = 0
+        for i, status_code in zip(indices, statuses):
+            url, local_path, file_info, url_type, fallback_url = files_to_download[i]
+            if status_code in [401, 403, 404] and fallback_url != url:
+                logger.warning(
+                    f"🔀 {url_type} 预检失败：{status_code=}, 改用 HF 下载: {local_path.name}"
+                )
+                files_to_download[i] = (url, local_path, file_info, "HF", fallback_url)
+                unavailable += 1
+
+        logger.info(f"🔥 连接预热: {len(indices)} 个 HEAD 请求 | 镜像不可用: {unavailable}")
+        return files_to_download
 
     def download_repo(
         self,
@@ -608,185 +1839,251 @@ class HFDownloader:
         exclude_patterns=None,
     ):
         """下载整个仓库"""
-        # 验证仓库ID
-        print(f"🔍 验证仓库: {repo_type} {repo_id} @ {revision}")
-        try:
-            self.hf_api.repo_info(repo_id, repo_type=repo_type, revision=revision)
-        except Exception as e:
-            print(f"❌ 仓库信息无效: {e}")
-            return False
-
-        local_dir = Path(local_dir)
-        local_dir.mkdir(parents=True, exist_ok=True)
-
-        # 获取文件列表
+        # 获取文件列表，同时完成仓库有效性验证
         files_info = self.get_repo_file_list(repo_id, repo_type, revision)
 
         if not files_info:
-            print("❌ 未找到文件或无法获取文件列表")
+            logger.error("❌ 未找到文件或无法获取文件列表")
             return False
 
-        # 过滤文件
-        if include_patterns:
-            files_info = [
-                f
-                for f in files_info
-                if any(pattern in f["filename"] for pattern in include_patterns)
-            ]
+        local_dir = Path(local_dir)
+        local_dir.mkdir(parents=True, exist_ok=True)
 
-        if exclude_patterns:
+        # 过滤文件：包含与排除模式各编译为一个正则，一次遍历完成
+        include_re = _compile_filename_patterns(include_patterns) if include_patterns else None
+        exclude_re = _compile_filename_patterns(exclude_patterns) if exclude_patterns else None
+        if include_re or exclude_re:
             files_info = [
                 f
                 for f in files_info
-                if not any(pattern in f["filename"] for pattern in exclude_patterns)
+                if (include_re is None or include_re.search(f.filename))
+                and (exclude_re is None or not exclude_re.search(f.filename))
             ]
 
-        # 分类文件
-        lfs_files = []
-        regular_files = []
-
-        for file_info in files_info:
-            if self.is_lfs_file(file_info):
-                lfs_files.append(file_info)
-            else:
-                regular_files.append(file_info)
-
-        total_files = len(files_info)
-        print(
-            f"📂 文件统计: 共 {total_files} 个 | LFS: {len(lfs_files)} | 普通: {len(regular_files)}"
-        )
-
+        # 单次遍历完成分类和下载任务构建
         files_to_download = []
+        lfs_count = 0
+
+        # 下载地址固定到文件列表所在的提交，避免下载过程中分支前移导致内容与列表不一致
+        pinned_revision = self.commit_hash or revision
 
         for file_info in files_info:
-            filename = file_info["filename"]
+            filename = file_info.filename
             local_path = local_dir / filename
-            is_lfs = self.is_lfs_file(file_info)
+            lfs_count += file_info.is_lfs
 
-            url, url_type, hf_mirror_param = self.build_download_url(
-                repo_id, filename, repo_type, revision, is_lfs
+            url, url_type, fallback_url = self.build_download_url(
+                repo_id, filename, repo_type, pinned_revision, file_info.is_lfs
             )
-            source_icon = "🔗" if url_type == "LFS" else "🪞"
-            print(f"{source_icon} 排队: {filename} | 来源: {url_type} | fileinfo: {file_info}")
             files_to_download.append(
-                (url, local_path, file_info, url_type, hf_mirror_param)
+                (url, local_path, file_info, url_type, fallback_url)
+            )
+
+        total_files = len(files_to_download)
+        logger.info(
+            f"📂 文件统计: 共 {total_files} 个 | LFS: {lfs_count} | 普通: {total_files - lfs_count}"
+        )
+
+        # 并行预校验本地已有文件，只把确实需要下载的文件交给下载线程
+        with ThreadPoolExecutor(max_workers=_VERIFY_WORKERS) as verifier:
+            verified = list(
+                verifier.map(
+                    lambda task: self.verify_file_integrity(local_dir, task[1], task[2]),
+                    files_to_download,
+                )
             )
+        files_to_download = [
+            task for task, is_valid in zip(files_to_download, verified) if not is_valid
+        ]
+        verified_without_downloads = total_files - len(files_to_download)
+        logger.info(f"🔄 已存在且通过校验: {verified_without_downloads} 个")
 
-        print(f"\n🧾 任务总数: {len(files_to_download)}")
+        logger.info(f"\n🧾 任务总数: {len(files_to_download)}")
 
         if not files_to_download:
-            print("✅ 所有文件均已通过校验，无需下载")
+            logger.info("✅ 所有文件均已通过校验，无需下载")
             return True
 
-        print("🚀 启动下载任务")
+        # 按大小降序提交 (LPT)，大文件尽早开始，与小文件下载重叠，避免最后只剩一个大文件拖尾
+        files_to_download.sort(key=lambda task: task[2].size or 0, reverse=True)
+
+        # 逐文件的排队信息只在 --verbose 时输出，大仓库默认不刷屏
+        if logger.isEnabledFor(logging.DEBUG):
+            for _, local_path, file_info, url_type, _ in files_to_download:
+                source_icon = "🔗" if url_type == "LFS" else "🪞"
+                logger.debug(
+                    f"{source_icon} 排队: {file_info.filename} | 来源: {url_type} | fileinfo: {file_info}"
+                )
+
+        files_to_download = self._warm_up(files_to_download, max_workers)
+
+        # 父目录统一预先创建，下载器内不再逐文件 mkdir；
+        # 由浅到深创建，每个目录的上级都已存在，mkdir 不会先失败再逐级回溯
+        parents = {local_path.parent for _, local_path, *_ in files_to_download}
+        for parent in sorted(parents, key=lambda p: len(p.parts)):
+            parent.mkdir(parents=True, exist_ok=True)
+
+        logger.info("🚀 启动下载任务")
 
         # 并发下载文件
-        successful_downloads = 0
+        successful_downloads = verified_without_downloads
         failed_downloads = 0
         total_bytes_downloaded = 0
         start_time = time.time()
         lfs_downloads = 0
         hf_downloads = 0
-        verified_without_downloads = 0
+
+        bytes_at_start = _bytes_counter.total()
+
+        def update_postfix(pbar):
+            # 由后台线程定时调用，速度按各下载线程累计的字节数计算
+            elapsed_time = time.time() - start_time
+            if elapsed_time > 0:
+                avg_speed = (_bytes_counter.total() - bytes_at_start) / elapsed_time
+                pbar.set_postfix(
+                    {
+                        "成功": successful_downloads,
+                        "失败": failed_downloads,
+                        "已验证": verified_without_downloads,
+                        "平均速度": f"{avg_speed / (1024*1024):.1f} MB/s",
+                    }
+                )
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_task = {
-                executor.submit(
+            # 只保持少量任务在途，按 LPT 顺序逐个补充，避免大仓库一次性创建全部 Future
+            tasks = iter(files_to_download)
+            future_to_task = {}
+
+            def submit_next():
+                task = next(tasks, None)
+                if task is None:
+                    return
+                url, local_path, file_info, url_type, fallback_url = task
+                future = executor.submit(
                     self.download_and_verify_file,
                     url,
                     local_dir,
                     local_path,
                     file_info,
                     url_type,
-                    hf_mirror_param,
-                ): (url, local_path, file_info, url_type, hf_mirror_param)
-                for url, local_path, file_info, url_type, hf_mirror_param in files_to_download
-            }
+                    fallback_url,
+                    skip_initial_verify=True,
+                )
+                future_to_task[future] = task
+
+            for _ in range(2 * max_workers):
+                submit_next()
 
             with tqdm(
                 total=len(files_to_download),
                 desc="文件下载进度",
                 unit="文件",
                 position=0,
-            ) as main_pbar:
-                for future in as_completed(future_to_task):
+            ) as main_pbar, _refresh_in_background(
+                lambda: update_postfix(main_pbar), _PROGRESS_REFRESH_SECONDS
+            ):
+                while future_to_task:
+                    done, _ = wait(future_to_task, return_when=FIRST_COMPLETED)
                     # 检查是否被中断
-                    if interrupted:
-                        print(f"\n⚠️  检测到中断信号，正在取消剩余下载任务...")
-                        # 取消所有未完成的任务
+                    if interrupt_event.is_set():
+                        logger.warning(f"\n⚠️  检测到中断信号，正在取消剩余下载任务...")
+                        # 取消所有未完成的任务，未提交的任务不再提交
                         for f in future_to_task:
                             f.cancel()
                         break
 
-                    try:
-                        url, local_path, file_info, url_type, hf_mirror_param = (
-                            future_to_task[future]
+                    for future in done:
+                        url, local_path, file_info, url_type, fallback_url = (
+                            future_to_task.pop(future)
                         )
-                        result = future.result()
-                        if isinstance(result, dict):
-                            if result.get("success"):
-                                successful_downloads += 1
-                                if result.get("downloaded"):
-                                    if result.get("url_type") == "LFS":
-                                        lfs_downloads += 1
-                                    else:
-                                        hf_downloads += 1
-                                    if local_path.exists():
+                        submit_next()
+                        try:
+                            result = future.result()
+                            if isinstance(result, dict):
+                                if result.get("success"):
+                                    successful_downloads += 1
+                                    if result.get("downloaded"):
+                                        if result.get("url_type") == "LFS":
+                                            lfs_downloads += 1
+                                        else:
+                                            hf_downloads += 1
                                         total_bytes_downloaded += (
-                                            local_path.stat().st_size
+                                            _file_size(local_path) or 0
                                         )
+                                    else:
+                                        verified_without_downloads += 1
+                                else:
+                                    failed_downloads += 1
+                                    logger.error(f"❌ 任务失败: {file_info.filename}")
+                            elif result:
+                                successful_downloads += 1
+                                if url_type == "LFS":
+                                    lfs_downloads += 1
                                 else:
-                                    verified_without_downloads += 1
+                                    hf_downloads += 1
+                                total_bytes_downloaded += _file_size(local_path) or 0
                             else:
                                 failed_downloads += 1
-                                print(f"❌ 任务失败: {file_info['filename']}")
-                        elif result:
-                            successful_downloads += 1
-                            if url_type == "LFS":
-                                lfs_downloads += 1
-                            else:
-                                hf_downloads += 1
-                            if local_path.exists():
-                                total_bytes_downloaded += local_path.stat().st_size
-                        else:
+                                logger.error(f"❌ 任务失败: {file_info.filename}")
+                        except Exception as e:
+                            logger.error(f"💥 任务异常: {local_path.name} | {e}")
                             failed_downloads += 1
-                            print(f"❌ 任务失败: {file_info['filename']}")
-                    except Exception as e:
-                        print(f"💥 任务异常: {local_path.name} | {e}")
-                        failed_downloads += 1
-                    finally:
-                        main_pbar.update(1)
-
-                        elapsed_time = time.time() - start_time
-                        if elapsed_time > 0:
-                            avg_speed = total_bytes_downloaded / elapsed_time
-                            main_pbar.set_postfix(
-                                {
-                                    "成功": successful_downloads,
-                                    "失败": failed_downloads,
-                                    "已验证": verified_without_downloads,
-                                    "平均速度": f"{avg_speed / (1024*1024):.1f} MB/s",
-                                }
-                            )
+                        finally:
+                            main_pbar.update(1)
 
         end_time = time.time()
         total_time = end_time - start_time
         avg_speed = total_bytes_downloaded / total_time if total_time > 0 else 0
 
-        print(f"\n📊 下载统计:")
-        print(f"  ✅ 成功: {successful_downloads}")
-        print(f"    🔄 已存在验证: {verified_without_downloads}")
-        print(f"    🔗 Xget下载: {lfs_downloads}")
-        print(f"    🪞 镜像下载: {hf_downloads}")
-        print(f"  ❌ 失败: {failed_downloads}")
-        print(f"  📁 总计: {len(files_to_download)}")
-        print(f"  💾 下载量: {total_bytes_downloaded / (1024*1024*1024):.2f} GB")
-        print(f"  ⏱️  用时: {total_time:.1f} 秒")
-        print(f"  🚀 平均速度: {avg_speed / (1024*1024):.1f} MB/s")
+        logger.info(f"\n📊 下载统计:")
+        logger.info(f"  ✅ 成功: {successful_downloads}")
+        logger.info(f"    🔄 已存在验证: {verified_without_downloads}")
+        logger.info(f"    🔗 Xget下载: {lfs_downloads}")
+        logger.info(f"    🪞 镜像下载: {hf_downloads}")
+        logger.info(f"  ❌ 失败: {failed_downloads}")
+        logger.info(f"  📁 总计: {total_files}")
+        logger.info(f"  💾 下载量: {total_bytes_downloaded / (1024*1024*1024):.2f} GB")
+        logger.info(f"  ⏱️  用时: {total_time:.1f} 秒")
+        logger.info(f"  🚀 平均速度: {avg_speed / (1024*1024):.1f} MB/s")
 
         return failed_downloads == 0
 
 
+def download_command(args):
+    """执行 download 子命令"""
+    try:
+        downloader = HFDownloader(
+            args.lfs_url,
+            args.hf_url,
+            args.hf_downloader,
+            args.lfs_downloader,
+            args.token,
+            max_workers=args.max_workers,
+            verify_mode=args.verify,
+        )
+    except Exception as e:
+        logger.error(f"❌ 初始化下载器失败: {e}")
+        return 1
+
+    success = downloader.download_repo(
+        repo_id=args.repo_id,
+        local_dir=args.local_dir,
+        repo_type=args.repo_type,
+        revision=args.revision,
+        max_workers=args.max_workers,
+        include_patterns=args.include,
+        exclude_patterns=args.exclude,
+    )
+
+    # 检查是否被中断
+    if interrupt_event.is_set():
+        logger.warning(f"\n⚠️  下载被用户中断 (Ctrl+C)")
+        logger.info("已下载的文件将保留在本地目录中")
+        return 130  # 标准的中断退出码
+
+    return 0 if success else 1
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Hugging Face 下载加速器",
@@ -828,15 +2125,27 @@ def main():
     )
     download_parser.add_argument(
         "--hf-downloader",
-        choices=["requests"],
+        choices=["requests", "httpx"],
         default="requests",
-        help="下载核心",
+        help="普通文件下载核心，httpx 使用 HTTP/2 多路复用 (默认: requests)",
+    )
+    download_parser.add_argument(
+        "--verify",
+        choices=["etag", "sha256"],
+        default="etag",
+        help="已有文件的校验方式，sha256 会重新计算 LFS 文件哈希 (默认: etag)",
     )
     download_parser.add_argument(
         "--lfs-downloader",
-        choices=["requests"],
-        default="requests",
-        help="下载核心",
+        choices=["parallel", "requests", "httpx"],
+        default="parallel",
+        help="LFS 文件下载核心，parallel 对大文件多连接分段下载 (默认: parallel)",
+    )
+    download_parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="输出调试日志，包括逐文件的排队信息和下载异常堆栈",
     )
 
     args = parser.parse_args()
@@ -846,31 +2155,13 @@ def main():
         return 1
 
     if args.command == "download":
-        try:
-            downloader = HFDownloader(
-                args.lfs_url, args.hf_url, args.hf_downloader, args.lfs_downloader, args.token
-            )
-        except Exception as e:
-            print(f"❌ 初始化下载器失败: {e}")
-            return 1
-
-        success = downloader.download_repo(
-            repo_id=args.repo_id,
-            local_dir=args.local_dir,
-            repo_type=args.repo_type,
-            revision=args.revision,
-            max_workers=args.max_workers,
-            include_patterns=args.include,
-            exclude_patterns=args.exclude,
+        log_listener = setup_logging(
+            logging.DEBUG if args.verbose else logging.INFO
         )
-
-        # 检查是否被中断
-        if interrupted:
-            print(f"\n⚠️  下载被用户中断 (Ctrl+C)")
-            print("已下载的文件将保留在本地目录中")
-            return 130  # 标准的中断退出码
-
-        return 0 if success else 1
+        try:
+            return download_command(args)
+        finally:
+            log_listener.stop()
 
     return 1
 